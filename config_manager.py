@@ -1,39 +1,63 @@
 """
 Configuration manager for QueueCTL
 """
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import db
+import utils
+
+
+# Per-process cache of config values. Config changes rarely, so reads are
+# served from here and only set_config writes through to it.
+_CACHE: Dict[str, Optional[str]] = {}
+_CACHE_LOADED = False
+
+# Backoff delays (backoff_base ** attempts) for the current backoff_base,
+# built on first use and dropped whenever the config cache changes
+BACKOFF_TABLE_SIZE = 64
+_BACKOFF_TABLE: Optional[List[int]] = None
 
 
 def get_config(key: str) -> Optional[str]:
     """Get a configuration value by key"""
+    if key in _CACHE:
+        return _CACHE[key]
+    if _CACHE_LOADED:
+        return None
+    
     result = db.fetch_one("SELECT value FROM config WHERE key = ?", (key,))
-    if result:
-        return result['value']
-    return None
+    value = result['value'] if result else None
+    _CACHE[key] = value
+    return value
 
 
 def get_all_configs() -> Dict[str, str]:
     """Get all configuration values"""
+    global _CACHE_LOADED
     results = db.execute_query("SELECT key, value FROM config ORDER BY key")
-    return {row['key']: row['value'] for row in results}
+    configs = {row['key']: row['value'] for row in results}
+    
+    _CACHE.clear()
+    _CACHE.update(configs)
+    _CACHE_LOADED = True
+    _invalidate_backoff_table()
+    
+    return configs
 
 
 def set_config(key: str, value: str) -> bool:
     """Set a configuration value"""
-    # Try to update first
-    rowcount = db.execute_update(
-        "UPDATE config SET value = ? WHERE key = ?",
-        (value, key)
+    # Single upsert: one commit, and no window for two concurrent inserts
+    db.execute_update(
+        """
+        INSERT INTO config (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (key, value)
     )
     
-    # If no rows updated, insert new config
-    if rowcount == 0:
-        db.execute_update(
-            "INSERT INTO config (key, value) VALUES (?, ?)",
-            (key, value)
-        )
-    
+    _CACHE[key] = value
+    if key == 'backoff_base':
+        _invalidate_backoff_table()
     return True
 
 
@@ -64,12 +88,39 @@ def get_poll_interval() -> int:
     return get_config_int('poll_interval', 1)
 
 
+def get_backoff_delay(attempts: int) -> int:
+    """
+    Get the retry delay in seconds after `attempts` failed attempts,
+    looked up in a table precomputed for the configured backoff_base
+    """
+    global _BACKOFF_TABLE
+    table = _BACKOFF_TABLE
+    if table is None:
+        base = get_backoff_base()
+        table = _BACKOFF_TABLE = [base ** i for i in range(BACKOFF_TABLE_SIZE)]
+    
+    if 0 <= attempts < BACKOFF_TABLE_SIZE:
+        return table[attempts]
+    return utils.calculate_backoff_delay(attempts, get_backoff_base())
+
+
+def _invalidate_backoff_table():
+    """Drop the backoff table so it is rebuilt from the current backoff_base"""
+    global _BACKOFF_TABLE
+    _BACKOFF_TABLE = None
+
+
+# Translation tables for the CLI <-> DB key formats, built once
+_NORMALIZE_KEY = str.maketrans('-', '_')
+_DENORMALIZE_KEY = str.maketrans('_', '-')
+
+
 def normalize_config_key(key: str) -> str:
     """
     Normalize config key from CLI format to DB format
     e.g., 'max-retries' -> 'max_retries'
     """
-    return key.replace('-', '_')
+    return key.translate(_NORMALIZE_KEY)
 
 
 def denormalize_config_key(key: str) -> str:
@@ -77,5 +128,5 @@ def denormalize_config_key(key: str) -> str:
     Denormalize config key from DB format to CLI format
     e.g., 'max_retries' -> 'max-retries'
     """
-    return key.replace('_', '-')
+    return key.translate(_DENORMALIZE_KEY)
 
@@ -3,10 +3,18 @@ Database layer for QueueCTL - SQLite persistence
 """
 import sqlite3
 import os
+import atexit
+import queue
+import threading
+import urllib.parse
 from contextlib import contextmanager
 from typing import Optional, Dict, List, Any
+import utils
 
 DB_FILE = "queuectl.db"
+# URI form of DB_FILE for mode=rw/rwc opens. Built once and left relative,
+# like a plain path, so no connection pays for resolving it.
+_DB_URI = "file:" + urllib.parse.quote(DB_FILE)
 
 JOBS_TABLE_SCHEMA = """
 CREATE TABLE IF NOT EXISTS jobs (
@@ -15,14 +23,14 @@ CREATE TABLE IF NOT EXISTS jobs (
   state TEXT NOT NULL,
   attempts INTEGER DEFAULT 0,
   max_retries INTEGER DEFAULT 3,
-  created_at TEXT NOT NULL,
-  updated_at TEXT NOT NULL,
-  next_run_at TEXT NOT NULL,
+  created_at INTEGER NOT NULL,
+  updated_at INTEGER NOT NULL,
+  next_run_at INTEGER NOT NULL,
   priority INTEGER DEFAULT 0,
   locked_by TEXT,
-  locked_at TEXT,
-  processing_started_at TEXT,
-  processing_finished_at TEXT,
+  locked_at INTEGER,
+  processing_started_at INTEGER,
+  processing_finished_at INTEGER,
   exit_code INTEGER,
   last_error TEXT,
   stdout_path TEXT,
@@ -31,6 +39,35 @@ CREATE TABLE IF NOT EXISTS jobs (
 );
 """
 
+# Timestamp columns hold UTC epoch seconds. Integers compare and sort
+# inline and keep index entries small; ISO strings are only produced for
+# display.
+TIMESTAMP_COLUMNS = (
+    'created_at',
+    'updated_at',
+    'next_run_at',
+    'locked_at',
+    'processing_started_at',
+    'processing_finished_at',
+)
+
+JOBS_INDEXES = [
+    # Worker polling and `list --state`: filter by state, ordered by priority
+    "CREATE INDEX IF NOT EXISTS idx_jobs_state_priority_run ON jobs(state, priority, next_run_at)",
+    # DLQ listing: newest dead jobs first
+    "CREATE INDEX IF NOT EXISTS idx_jobs_state_updated ON jobs(state, updated_at DESC)",
+    # Unfiltered `list`: newest jobs first
+    "CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC)",
+    # Job claim and `list --due`: covers the claim subquery, and holds only
+    # pending jobs, so finished jobs piling up don't grow it
+    "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, priority, next_run_at, id) "
+    "WHERE state = 'pending'",
+    # Idle workers' MIN(next_run_at) lookup: one index probe instead of a
+    # scan over every pending job
+    "CREATE INDEX IF NOT EXISTS idx_jobs_pending_run ON jobs(state, next_run_at) "
+    "WHERE state = 'pending'",
+]
+
 CONFIG_TABLE_SCHEMA = """
 CREATE TABLE IF NOT EXISTS config (
   key TEXT PRIMARY KEY,
@@ -38,6 +75,23 @@ CREATE TABLE IF NOT EXISTS config (
 );
 """
 
+# Per-connection tuning. WAL (set once in init_db, it is persistent in the
+# file) lets readers run alongside a writer; with WAL, synchronous=NORMAL
+# only fsyncs at checkpoints while keeping the database consistent.
+# mmap_size lets reads come straight from the OS page cache instead of
+# being copied into SQLite's own; cache_size is in KiB when negative, and
+# is only allocated as pages are actually used.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# Prepared statements kept per connection, keyed by SQL text. Sized to
+# hold every distinct statement the CLI and workers issue.
+STATEMENT_CACHE_SIZE = 256
+
 DEFAULT_CONFIGS = [
     ('max_retries', '3'),
     ('backoff_base', '2'),
@@ -45,45 +99,235 @@ DEFAULT_CONFIGS = [
 ]
 
 
-@contextmanager
-def get_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DB_FILE, timeout=10.0)
+# One writer connection per process, shared by all threads behind a lock.
+# Reusing it keeps SQLite's page cache warm and avoids reconnecting on
+# every query.
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.RLock()
+# Nesting depth of get_connection blocks; only the outermost one commits
+_DEPTH = 0
+
+# Read-only connections for SELECTs. With WAL they read concurrently with
+# the writer and with each other, so polling and listing never wait on
+# _LOCK. Created on demand and returned to the pool after use.
+_READERS: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+_ALL_READERS: List[sqlite3.Connection] = []
+_READERS_LOCK = threading.Lock()
+
+
+class DatabaseNotInitializedError(Exception):
+    """Raised when the database file does not exist yet (run init-db)"""
+
+
+class OutdatedSchemaError(DatabaseNotInitializedError):
+    """Raised when the database still has the old ISO timestamp schema (run init-db)"""
+
+
+class MigrationError(Exception):
+    """Raised when init_db cannot convert existing jobs to the current schema"""
+
+
+def _open_connection(create: bool = False) -> sqlite3.Connection:
+    """
+    Open a tuned connection to DB_FILE.
+    Unless create is set the file must already exist; opening in mode=rw
+    lets SQLite report a missing database, so no separate stat is needed.
+    It must also already have the current schema: a database from an
+    older version raises OutdatedSchemaError until init_db migrates it.
+    """
+    mode = "rwc" if create else "rw"
+    try:
+        conn = sqlite3.connect(
+            f"{_DB_URI}?mode={mode}",
+            uri=True,
+            timeout=10.0,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+    except sqlite3.OperationalError:
+        if not create and not db_exists():
+            raise DatabaseNotInitializedError(
+                "Database not initialized. Run 'queuectl init-db' first."
+            ) from None
+        raise
     conn.row_factory = sqlite3.Row
+    if not create and _has_iso_timestamps(conn):
+        conn.close()
+        raise OutdatedSchemaError(
+            "Database uses the old timestamp format. Run 'queuectl init-db' to upgrade it."
+        )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _has_iso_timestamps(conn: sqlite3.Connection) -> bool:
+    """True if the jobs table still has the TEXT timestamp columns of older versions"""
+    for row in conn.execute("PRAGMA table_info(jobs)"):
+        if row['name'] == 'next_run_at':
+            return row['type'].upper() == 'TEXT'
+    return False
+
+
+def _get_conn(create: bool = False) -> sqlite3.Connection:
+    """Return the shared writer connection, opening it on first use"""
+    global _CONN
+    if _CONN is None:
+        _CONN = _open_connection(create)
+    return _CONN
+
+
+def close_connection():
+    """Close the writer and all pooled readers (they reopen on next use)"""
+    global _CONN
+    with _LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+    with _READERS_LOCK:
+        for conn in _ALL_READERS:
+            conn.close()
+        _ALL_READERS.clear()
+        while not _READERS.empty():
+            _READERS.get_nowait()
+
+
+atexit.register(close_connection)
+
+
+@contextmanager
+def get_connection(create: bool = False):
+    """
+    Context manager for the shared writer connection.
+    Raises DatabaseNotInitializedError if the database file is missing,
+    unless create is set.
+    Holds the writer lock for the duration of the block. Keeps sqlite3's
+    default deferred transactions: the first write opens a transaction
+    which is committed on success and rolled back on error. Nested blocks
+    join the outer one, which alone commits or rolls back.
+    """
+    global _DEPTH
+    with _LOCK:
+        conn = _get_conn(create)
+        _DEPTH += 1
+        try:
+            yield conn
+            if _DEPTH == 1:
+                conn.commit()
+        except Exception:
+            if _DEPTH == 1:
+                conn.rollback()
+            raise
+        finally:
+            _DEPTH -= 1
+
+
+@contextmanager
+def transaction():
+    """
+    Group several writes into one transaction, with one commit for the block.
+    BEGIN IMMEDIATE takes the write lock up front, so rows read inside the
+    block cannot be changed by another process before the commit.
+    """
+    with get_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+@contextmanager
+def get_reader():
+    """Context manager lending a read-only connection from the pool"""
+    try:
+        conn = _READERS.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+        conn.execute("PRAGMA query_only=true")
+        with _READERS_LOCK:
+            _ALL_READERS.append(conn)
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
     finally:
-        conn.close()
+        _READERS.put(conn)
 
 
 def init_db():
     """Initialize the database with tables and default config"""
-    with get_connection() as conn:
+    with get_connection(create=True) as conn:
         cursor = conn.cursor()
         
+        # Journal mode is stored in the database file, so set it once here.
+        # It can't change inside a transaction, so this runs before any write.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Create tables
         cursor.execute(JOBS_TABLE_SCHEMA)
         cursor.execute(CONFIG_TABLE_SCHEMA)
         
-        # Insert default configs
-        for key, value in DEFAULT_CONFIGS:
-            cursor.execute(
-                "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
-                (key, value)
-            )
+        _migrate_iso_timestamps(conn)
         
-        conn.commit()
+        for index_sql in JOBS_INDEXES:
+            cursor.execute(index_sql)
+        
+        # Insert default configs
+        cursor.executemany(
+            "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
+            DEFAULT_CONFIGS
+        )
     
     return True
 
 
+def _migrate_iso_timestamps(conn: sqlite3.Connection):
+    """
+    Convert a jobs table from older versions, which stored ISO timestamp
+    strings in TEXT columns, to INTEGER epoch seconds. The table is rebuilt
+    because SQLite cannot change a declared column type, and TEXT affinity
+    would turn stored integers back into strings.
+    
+    Values are converted with utils.to_epoch, as at enqueue time, before
+    anything is changed. Digit-only strings are taken as epoch seconds
+    already (written by a newer version into the TEXT columns); one that won't convert raises MigrationError with
+    the jobs table untouched. The rebuild itself runs in one transaction,
+    so a failure part way rolls back the rename too.
+    """
+    if not _has_iso_timestamps(conn):
+        return
+    
+    names = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]
+    timestamp_indexes = [i for i, name in enumerate(names) if name in TIMESTAMP_COLUMNS]
+    rows = []
+    for row in conn.execute(f"SELECT {', '.join(names)} FROM jobs"):
+        values = list(row)
+        for i in timestamp_indexes:
+            if values[i] is None:
+                continue
+            if isinstance(values[i], str) and values[i].isdecimal():
+                values[i] = int(values[i])
+                continue
+            try:
+                values[i] = utils.to_epoch(values[i])
+            except (ValueError, TypeError, AttributeError):
+                raise MigrationError(
+                    f"Cannot migrate job {row['id']}: {names[i]} = {values[i]!r} "
+                    "is not a valid ISO timestamp. The jobs table was left unchanged; "
+                    "fix or delete that row and run 'queuectl init-db' again."
+                ) from None
+        rows.append(values)
+    
+    with transaction() as tx:
+        tx.execute("ALTER TABLE jobs RENAME TO jobs_iso")
+        tx.execute(JOBS_TABLE_SCHEMA)
+        tx.executemany(
+            f"INSERT INTO jobs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+            rows
+        )
+        tx.execute("DROP TABLE jobs_iso")
+
+
 def execute_query(query: str, params: tuple = ()) -> List[sqlite3.Row]:
-    """Execute a SELECT query and return results"""
-    with get_connection() as conn:
+    """Execute a SELECT query on a pooled reader and return results"""
+    with get_reader() as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
         return cursor.fetchall()
@@ -94,7 +338,6 @@ def execute_update(query: str, params: tuple = ()) -> int:
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
-        conn.commit()
         return cursor.rowcount
 
 
@@ -103,13 +346,12 @@ def execute_many(query: str, params_list: List[tuple]) -> int:
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.executemany(query, params_list)
-        conn.commit()
         return cursor.rowcount
 
 
 def fetch_one(query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
-    """Execute a query and return a single row"""
-    with get_connection() as conn:
+    """Execute a SELECT query on a pooled reader and return a single row"""
+    with get_reader() as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
         return cursor.fetchone()
@@ -117,23 +359,19 @@ def fetch_one(query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
 
 def atomic_update_and_fetch(update_query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
     """
-    Execute an UPDATE and return the updated row atomically.
-    Used for worker job locking.
+    Execute a write with a RETURNING clause (UPDATE ... RETURNING,
+    INSERT OR IGNORE ... RETURNING) and return the affected row, or None
+    if no row was written. The write and the read of the row happen in a
+    single statement, so there is no window for another writer between
+    them. Used for worker job locking and duplicate-safe enqueue.
     """
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(update_query, params)
-        
-        # For SQLite, we need to fetch the updated row separately
-        # The query should include a WHERE clause with the job ID
-        if cursor.rowcount > 0:
-            # Extract job ID from params (assuming it's the last param for our use case)
-            # This is a simplified approach - in production, you'd want a more robust method
-            conn.commit()
-            return cursor.lastrowid
-        
-        conn.commit()
-        return None
+        row = cursor.fetchone()
+        # Drain the statement so it finishes before the commit
+        cursor.fetchall()
+        return row
 
 
 def db_exists() -> bool:
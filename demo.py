@@ -7,9 +7,14 @@ import subprocess
 import time
 import os
 import shutil
-
-def run_cmd(args, description="", show_command=True):
-    """Run a command and display output"""
+import sys
+
+def run_cmd(args, description="", show_command=True, stream=False):
+    """
+    Run a command and display output.
+    With stream=True the child writes straight to our stdout/stderr
+    instead of being buffered (use for long-running commands).
+    """
     if description:
         print(f"\n{'='*80}")
         print(f"  {description}")
@@ -19,6 +24,11 @@ def run_cmd(args, description="", show_command=True):
         cmd_str = ' '.join(args)
         print(f"\n$ {cmd_str}\n")
 
+    if stream:
+        # Flush our own buffered output so it stays ahead of the child's
+        sys.stdout.flush()
+        return subprocess.run(args).returncode == 0
+
     result = subprocess.run(args, capture_output=True, text=True)
     if result.stdout:
         print(result.stdout)
@@ -86,14 +96,10 @@ run_cmd(["python", "queuectl.py", "list"], "6. List all jobs")
 run_cmd(["python", "queuectl.py", "config", "get"], "7. Current configuration")
 
 # Start workers
-print("\n" + "="*80)
-print("  8. Starting 2 workers (will stop when queue is empty)")
-print("="*80)
-print("\n$ python queuectl.py worker start --count 2 --stop-when-empty\n")
-print("Workers processing jobs...\n")
-subprocess.run(
+run_cmd(
     ["python", "queuectl.py", "worker", "start", "--count", "2", "--stop-when-empty"],
-    capture_output=False
+    "8. Starting 2 workers (will stop when queue is empty)",
+    stream=True
 )
 
 # Show final status
@@ -4,10 +4,10 @@ Simple wrapper for enqueuing jobs - easier to use than dealing with shell quotin
 Usage: python enqueue.py --id JOB_ID --command "COMMAND" [OPTIONS]
 """
 
-import json
-import subprocess
 import sys
 import argparse
+import db
+import job_manager
 
 def main():
     parser = argparse.ArgumentParser(description='Enqueue a job to QueueCTL')
@@ -38,21 +38,19 @@ def main():
     if args.run_at is not None:
         job['run_at'] = args.run_at
     
-    # Convert to JSON
-    job_json = json.dumps(job)
+    # Enqueue in-process rather than spawning queuectl.py
+    try:
+        success, message, _ = job_manager.enqueue_job(job)
+    except db.DatabaseNotInitializedError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
     
-    # Call queuectl
-    result = subprocess.run(
-        ['python', 'queuectl.py', 'enqueue', job_json],
-        capture_output=True,
-        text=True
-    )
+    if success:
+        print(message)
+        sys.exit(0)
     
-    print(result.stdout, end='')
-    if result.stderr:
-        print(result.stderr, end='', file=sys.stderr)
-    
-    sys.exit(result.returncode)
+    print(f"Error: {message}", file=sys.stderr)
+    sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -1,22 +1,68 @@
 """
 Job manager for QueueCTL - handles job operations
 """
-from typing import Optional, List, Dict, Any
-import json
+from typing import Optional, List, Dict, Any, Callable
+import sqlite3
 import db
 import utils
 import config_manager
 
 
-def enqueue_job(job_data: dict) -> tuple:
-    """
-    Enqueue a new job. Returns (success, message, job_id)
-    """
-    # Validate job data
-    is_valid, error_msg = utils.validate_job_data(job_data)
-    if not is_valid:
-        return False, error_msg, None
-    
+_JOB_INSERT = """
+    INTO jobs (
+        id, command, state, attempts, max_retries, 
+        created_at, updated_at, next_run_at, priority,
+        timeout_seconds
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_JOB_SQL = "INSERT" + _JOB_INSERT
+
+# Single-job insert that reports a duplicate id by returning no row,
+# instead of raising an IntegrityError
+INSERT_JOB_IF_NEW_SQL = "INSERT OR IGNORE" + _JOB_INSERT + "RETURNING id"
+
+
+# Columns fetched for the list views, so large fields such as last_error
+# and the log paths are only read when actually displayed
+LIST_COLUMNS = "id, state, attempts, max_retries, next_run_at, command"
+DLQ_LIST_COLUMNS = "id, attempts, max_retries, last_error"
+
+# Columns returned by claim_next_job: what a worker needs to run a job
+CLAIM_COLUMNS = "id, command, attempts, max_retries, timeout_seconds"
+
+
+# Callbacks run whenever jobs may have become claimable in this process, so
+# idle workers wake straight away instead of at their next poll. Jobs
+# enqueued by another process are still picked up by the poll timeout.
+# Callbacks may run on any thread.
+_job_listeners: List[Callable[[], None]] = []
+
+
+def add_job_listener(callback: Callable[[], None]):
+    """Register a callback to run when jobs may have become claimable"""
+    _job_listeners.append(callback)
+
+
+def remove_job_listener(callback: Callable[[], None]):
+    """Unregister a callback added with add_job_listener"""
+    _job_listeners.remove(callback)
+
+
+def notify_job_available():
+    """Run every registered job listener"""
+    for callback in list(_job_listeners):
+        callback()
+
+
+def get_next_run_at() -> Optional[int]:
+    """Return the earliest next_run_at among pending jobs, or None"""
+    row = db.fetch_one("SELECT MIN(next_run_at) FROM jobs WHERE state = 'pending'")
+    return row[0] if row else None
+
+
+def _build_job_row(job_data: dict) -> tuple:
+    """Build the INSERT_JOB_SQL parameters for validated job data"""
     job_id = job_data['id']
     command = job_data['command']
     
@@ -26,87 +72,183 @@ def enqueue_job(job_data: dict) -> tuple:
     timeout_seconds = job_data.get('timeout_seconds', 30)
     
     # Determine next_run_at
+    created_at = utils.now_epoch()
     if 'run_at' in job_data:
-        next_run_at = job_data['run_at']
+        next_run_at = utils.to_epoch(job_data['run_at'])
     else:
-        next_run_at = utils.now_iso()
+        next_run_at = created_at
     
-    created_at = utils.now_iso()
+    return (
+        job_id, command, 'pending', 0, max_retries,
+        created_at, created_at, next_run_at, priority,
+        timeout_seconds
+    )
+
+
+def enqueue_job(job_data: dict) -> tuple:
+    """
+    Enqueue a new job. Returns (success, message, job_id)
+    """
+    # Validate job data
+    is_valid, error_msg = utils.validate_job_data(job_data)
+    if not is_valid:
+        return False, error_msg, None
     
-    # Get log paths
-    stdout_path, stderr_path = utils.get_log_paths(job_id)
+    row = _build_job_row(job_data)
+    job_id, max_retries, priority = row[0], row[4], row[8]
     
     # Insert job
     try:
-        db.execute_update(
-            """
-            INSERT INTO jobs (
-                id, command, state, attempts, max_retries, 
-                created_at, updated_at, next_run_at, priority,
-                timeout_seconds, stdout_path, stderr_path
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                job_id, command, 'pending', 0, max_retries,
-                created_at, created_at, next_run_at, priority,
-                timeout_seconds, stdout_path, stderr_path
-            )
+        inserted = db.atomic_update_and_fetch(INSERT_JOB_IF_NEW_SQL, row)
+    except db.DatabaseNotInitializedError:
+        raise
+    except Exception as e:
+        return False, f"Failed to enqueue job: {str(e)}", None
+    
+    if inserted is None:
+        return False, f"Job {job_id} already exists", None
+    
+    notify_job_available()
+    return True, f"Enqueued job {job_id} (state=pending, retries={max_retries}, priority={priority})", job_id
+
+
+def validate_jobs(jobs: List[dict], line_numbers: Optional[List[int]] = None) -> List[tuple]:
+    """
+    Validate every job and return (number, error_message) for each invalid
+    one, where number is the job's source line from line_numbers (one per
+    job) or, without it, the job's 1-based position in the list. Ids that
+    repeat an earlier job in the batch or are already in the database are
+    reported too.
+    """
+    numbers = line_numbers if line_numbers is not None else range(1, len(jobs) + 1)
+    errors = []
+    valid = []
+    for number, job_data in zip(numbers, jobs):
+        is_valid, error_msg = utils.validate_job_data(job_data)
+        if is_valid:
+            valid.append((number, job_data['id']))
+        else:
+            errors.append((number, error_msg))
+    
+    existing = _existing_job_ids([job_id for _, job_id in valid])
+    seen = set()
+    for number, job_id in valid:
+        # The id column has TEXT affinity, so 5 and "5" are the same job
+        key = str(job_id)
+        if key in seen or key in existing:
+            errors.append((number, f"Job {job_id} already exists"))
+        seen.add(key)
+    
+    errors.sort(key=lambda error: error[0])
+    return errors
+
+
+# Ids per IN (...) lookup, below SQLite's default 999 bound-parameter limit
+_ID_LOOKUP_CHUNK = 900
+
+
+def _existing_job_ids(job_ids: List[Any]) -> set:
+    """Return which of job_ids are already in the jobs table, as strings"""
+    existing = set()
+    for start in range(0, len(job_ids), _ID_LOOKUP_CHUNK):
+        chunk = job_ids[start:start + _ID_LOOKUP_CHUNK]
+        rows = db.execute_query(
+            f"SELECT id FROM jobs WHERE id IN ({', '.join('?' * len(chunk))})", tuple(chunk)
         )
-        
-        return True, f"Enqueued job {job_id} (state=pending, retries={max_retries}, priority={priority})", job_id
+        existing.update(row['id'] for row in rows)
+    return existing
+
+
+def enqueue_jobs(jobs: List[dict], line_numbers: Optional[List[int]] = None) -> tuple:
+    """
+    Enqueue many jobs in a single transaction. Returns (success, message, job_ids)
+    Either every job is enqueued or none is; on invalid input the message
+    has one "Line N: ..." (or "Job #N: ..." without line_numbers) per error.
+    """
+    label = "Line " if line_numbers is not None else "Job #"
+    errors = validate_jobs(jobs, line_numbers)
+    if errors:
+        return False, "\n".join(f"{label}{number}: {error}" for number, error in errors), []
+    rows = [_build_job_row(job_data) for job_data in jobs]
+    
+    if not rows:
+        return True, "No jobs to enqueue", []
     
+    try:
+        db.execute_many(INSERT_JOB_SQL, rows)
+    except db.DatabaseNotInitializedError:
+        raise
+    except sqlite3.IntegrityError as e:
+        # Another process enqueued one of the ids since validate_jobs ran
+        errors = validate_jobs(jobs, line_numbers)
+        if not errors:
+            return False, f"Failed to enqueue jobs: {str(e)}", []
+        return False, "\n".join(f"{label}{number}: {error}" for number, error in errors), []
     except Exception as e:
-        return False, f"Failed to enqueue job: {str(e)}", None
+        return False, f"Failed to enqueue jobs: {str(e)}", []
+    
+    notify_job_available()
+    job_ids = [row[0] for row in rows]
+    return True, f"Enqueued {len(job_ids)} jobs (state=pending)", job_ids
 
 
-def get_job(job_id: str) -> Optional[Dict]:
+def get_job(job_id: str) -> Optional[sqlite3.Row]:
     """Get a job by ID"""
-    result = db.fetch_one("SELECT * FROM jobs WHERE id = ?", (job_id,))
-    if result:
-        return dict(result)
-    return None
+    return db.fetch_one("SELECT * FROM jobs WHERE id = ?", (job_id,))
 
 
-def list_jobs(state: Optional[str] = None, limit: int = 100) -> List[Dict]:
-    """List jobs, optionally filtered by state"""
-    if state:
-        query = "SELECT * FROM jobs WHERE state = ? ORDER BY priority ASC, next_run_at ASC LIMIT ?"
+def list_jobs(state: Optional[str] = None, limit: int = 100,
+              due_only: bool = False) -> List[sqlite3.Row]:
+    """
+    List jobs, optionally filtered by state.
+    With due_only, list only pending jobs whose next_run_at has passed; the
+    time filter runs in SQL so scheduled jobs are never fetched.
+    Only the columns shown by `queuectl list` are fetched; use get_job for
+    the full record. Rows support job['column'] access; call dict(row)
+    where a copy is needed.
+    """
+    if due_only:
+        query = (
+            f"SELECT {LIST_COLUMNS} FROM jobs WHERE state = 'pending' AND next_run_at <= ? "
+            "ORDER BY priority ASC, next_run_at ASC LIMIT ?"
+        )
+        results = db.execute_query(query, (utils.now_epoch(), limit))
+    elif state:
+        query = f"SELECT {LIST_COLUMNS} FROM jobs WHERE state = ? ORDER BY priority ASC, next_run_at ASC LIMIT ?"
         results = db.execute_query(query, (state, limit))
     else:
-        query = "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?"
+        query = f"SELECT {LIST_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?"
         results = db.execute_query(query, (limit,))
     
-    return [dict(row) for row in results]
+    return results
 
 
 def get_job_counts() -> Dict[str, int]:
     """Get count of jobs by state"""
-    results = db.execute_query("SELECT state, COUNT(*) as count FROM jobs GROUP BY state")
-    
-    counts = {
-        'total': 0,
-        'pending': 0,
-        'processing': 0,
-        'completed': 0,
-        'failed': 0,
-        'dead': 0
-    }
-    
-    for row in results:
-        state = row['state']
-        count = row['count']
-        counts[state] = count
-        counts['total'] += count
-    
-    return counts
+    # One row, one pass over the state index; COALESCE covers an empty table
+    row = db.fetch_one(
+        """
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(state = 'pending'), 0) AS pending,
+            COALESCE(SUM(state = 'processing'), 0) AS processing,
+            COALESCE(SUM(state = 'completed'), 0) AS completed,
+            COALESCE(SUM(state = 'failed'), 0) AS failed,
+            COALESCE(SUM(state = 'dead'), 0) AS dead
+        FROM jobs
+        """
+    )
+    return dict(row)
 
 
 def update_job_state(job_id: str, state: str, **kwargs) -> bool:
     """Update job state and other fields"""
     updates = ['state = ?', 'updated_at = ?']
-    params = [state, utils.now_iso()]
+    params = [state, utils.now_epoch()]
     
-    for key, value in kwargs.items():
+    # Sorted so the same set of fields always yields the same SQL text,
+    # which lets the connection reuse its cached prepared statement
+    for key, value in sorted(kwargs.items()):
         updates.append(f"{key} = ?")
         params.append(value)
     
@@ -118,45 +260,156 @@ def update_job_state(job_id: str, state: str, **kwargs) -> bool:
     return rowcount > 0
 
 
-def list_dlq_jobs(limit: int = 100) -> List[Dict]:
-    """List jobs in Dead Letter Queue"""
-    results = db.execute_query(
-        "SELECT * FROM jobs WHERE state = 'dead' ORDER BY updated_at DESC LIMIT ?",
-        (limit,)
+# Prebuilt SQL for the worker's state transitions, so the hot path neither
+# rebuilds query text nor misses the prepared-statement cache.
+# Claim the next due pending job for a worker and return it, in one
+# statement. The subquery runs inside the UPDATE's write lock, so two
+# workers can never claim the same job.
+_SQL_CLAIM_NEXT = """
+    UPDATE jobs
+    SET state = 'processing',
+        locked_by = ?,
+        stdout_path = ?,
+        stderr_path = ?,
+        locked_at = ?,
+        processing_started_at = ?,
+        updated_at = ?
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE state = 'pending' AND next_run_at <= ?
+        ORDER BY priority ASC, next_run_at ASC
+        LIMIT 1
     )
-    return [dict(row) for row in results]
+    RETURNING """ + CLAIM_COLUMNS
 
+_SQL_ANY_DUE = "SELECT 1 FROM jobs WHERE state = 'pending' AND next_run_at <= ? LIMIT 1"
 
-def retry_dlq_job(job_id: str) -> tuple:
+_SQL_TO_COMPLETED = """
+    UPDATE jobs
+    SET state = 'completed',
+        exit_code = ?,
+        processing_finished_at = ?,
+        updated_at = ?
+    WHERE id = ?
+"""
+
+_SQL_TO_DEAD = """
+    UPDATE jobs
+    SET state = 'dead',
+        attempts = ?,
+        exit_code = ?,
+        last_error = ?,
+        processing_finished_at = ?,
+        updated_at = ?
+    WHERE id = ?
+"""
+
+_SQL_TO_RETRY = """
+    UPDATE jobs
+    SET state = 'pending',
+        attempts = ?,
+        exit_code = ?,
+        last_error = ?,
+        next_run_at = ?,
+        locked_by = NULL,
+        locked_at = NULL,
+        updated_at = ?
+    WHERE id = ?
+"""
+
+
+def claim_next_job(worker_id: str, ts: int,
+                   stdout_path: Optional[str] = None,
+                   stderr_path: Optional[str] = None) -> Optional[sqlite3.Row]:
     """
-    Retry a job from DLQ. Returns (success, message)
+    Lock the next eligible job for a worker. None if nothing is due.
+    The job's stdout_path and stderr_path are set to the worker logs its
+    output is written to. The Row holds the CLAIM_COLUMNS the
+    worker needs to run the job.
     """
-    job = get_job(job_id)
-    
-    if not job:
-        return False, f"Job {job_id} not found"
+    # The claim takes the database write lock even when nothing matches, so
+    # idle workers would keep blocking enqueues and each other; check for
+    # a due job on a read-only connection first
+    if db.fetch_one(_SQL_ANY_DUE, (ts,)) is None:
+        return None
     
-    if job['state'] != 'dead':
-        return False, f"Job {job_id} is not in DLQ (current state: {job['state']})"
+    return db.atomic_update_and_fetch(
+        _SQL_CLAIM_NEXT, (worker_id, stdout_path, stderr_path, ts, ts, ts, ts)
+    )
+
+
+def apply_job_results(completed: List[tuple], dead: List[tuple],
+                      retried: List[tuple]):
+    """
+    Write a batch of finished-job updates in one transaction. The tuples are
+    completed: (job_id, exit_code, ts)
+    dead:      (job_id, attempts, exit_code, error, ts)
+    retried:   (job_id, attempts, exit_code, error, next_run_at, ts)
+    """
+    with db.transaction() as conn:
+        if completed:
+            conn.executemany(_SQL_TO_COMPLETED, [
+                (exit_code, ts, ts, job_id)
+                for job_id, exit_code, ts in completed
+            ])
+        if dead:
+            conn.executemany(_SQL_TO_DEAD, [
+                (attempts, exit_code, error, ts, ts, job_id)
+                for job_id, attempts, exit_code, error, ts in dead
+            ])
+        if retried:
+            conn.executemany(_SQL_TO_RETRY, [
+                (attempts, exit_code, error, next_run_at, ts, job_id)
+                for job_id, attempts, exit_code, error, next_run_at, ts in retried
+            ])
     
-    # Reset job for retry
-    rowcount = db.execute_update(
-        """
-        UPDATE jobs 
-        SET state = 'pending', 
-            attempts = 0, 
-            next_run_at = ?,
-            updated_at = ?,
-            locked_by = NULL,
-            locked_at = NULL,
-            last_error = NULL
-        WHERE id = ?
-        """,
-        (utils.now_iso(), utils.now_iso(), job_id)
+    if retried:
+        # Waiting workers may need an earlier wake-up for the retries
+        notify_job_available()
+
+
+def list_dlq_jobs(limit: int = 100) -> List[sqlite3.Row]:
+    """List jobs in Dead Letter Queue (the columns shown by `queuectl dlq list`)"""
+    return db.execute_query(
+        f"SELECT {DLQ_LIST_COLUMNS} FROM jobs WHERE state = 'dead' ORDER BY updated_at DESC LIMIT ?",
+        (limit,)
     )
+
+
+def retry_dlq_job(job_id: str) -> tuple:
+    """
+    Retry a job from DLQ. Returns (success, message)
+    """
+    # Check and reset in one transaction so the job can't change in between
+    with db.transaction() as conn:
+        job = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        
+        if not job:
+            return False, f"Job {job_id} not found"
+        
+        if job['state'] != 'dead':
+            return False, f"Job {job_id} is not in DLQ (current state: {job['state']})"
+        
+        # Reset job for retry
+        now = utils.now_epoch()
+        cursor = conn.execute(
+            """
+            UPDATE jobs 
+            SET state = 'pending', 
+                attempts = 0, 
+                next_run_at = ?,
+                updated_at = ?,
+                locked_by = NULL,
+                locked_at = NULL,
+                last_error = NULL
+            WHERE id = ?
+            """,
+            (now, now, job_id)
+        )
+        rowcount = cursor.rowcount
     
     if rowcount > 0:
+        notify_job_available()
         return True, f"Retried job {job_id} from DLQ -> pending"
     else:
         return False, f"Failed to retry job {job_id}"
-
@@ -6,13 +6,24 @@ import click
 import json
 import sys
 import db
-import job_manager
-import worker
 import config_manager
 import utils
+# job_manager and worker are imported inside the commands that use them,
+# so commands like `config get` don't pay for loading them at startup.
 
 
-@click.group()
+class QueueCtlGroup(click.Group):
+    """Command group that reports a missing database once for every command"""
+
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except db.DatabaseNotInitializedError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+
+
+@click.group(cls=QueueCtlGroup)
 def cli():
     """QueueCTL - Background job queue management system"""
     pass
@@ -26,7 +37,11 @@ def init_db():
         if not click.confirm("Do you want to reinitialize it?"):
             return
     
-    db.init_db()
+    try:
+        db.init_db()
+    except db.MigrationError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
     click.echo("[OK] Database initialized successfully at queuectl.db")
 
 
@@ -38,10 +53,7 @@ def enqueue(job_json):
     
     Example: queuectl enqueue '{"id":"job1","command":"echo Hello"}'
     """
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-    
+    import job_manager
     try:
         job_data = json.loads(job_json)
     except json.JSONDecodeError as e:
@@ -57,6 +69,48 @@ def enqueue(job_json):
         sys.exit(1)
 
 
+@cli.command(name='enqueue-file')
+@click.argument('jobs_file', type=click.File('r'))
+def enqueue_file(jobs_file):
+    """
+    Enqueue jobs from a JSON-lines file (one job object per line)
+    
+    All jobs are inserted in a single transaction. Use '-' to read stdin.
+    
+    Example: queuectl enqueue-file jobs.jsonl
+    """
+    import job_manager
+    jobs = []
+    line_numbers = []
+    errors = []
+    for line_no, line in enumerate(jobs_file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append((line_no, f"Invalid JSON: {e}"))
+            continue
+        jobs.append(job)
+        line_numbers.append(line_no)
+    
+    if errors:
+        # Report the invalid jobs too, so one run lists every problem
+        errors.extend(job_manager.validate_jobs(jobs, line_numbers))
+        success = False
+        message = "\n".join(f"Line {line_no}: {error}" for line_no, error in sorted(errors))
+    else:
+        success, message, job_ids = job_manager.enqueue_jobs(jobs, line_numbers)
+    
+    if success:
+        click.echo(message)
+    else:
+        for error in message.split("\n"):
+            click.echo(f"Error: {error}", err=True)
+        sys.exit(1)
+
+
 @cli.group()
 def worker_group():
     """Worker management commands"""
@@ -68,10 +122,7 @@ def worker_group():
 @click.option('--stop-when-empty', is_flag=True, help='Stop workers when queue is empty')
 def worker_start(count, stop_when_empty):
     """Start worker processes"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-
+    import worker
     if count < 1:
         click.echo("Error: Worker count must be at least 1", err=True)
         sys.exit(1)
@@ -85,17 +136,17 @@ def worker_start(count, stop_when_empty):
 @worker_group.command(name='stop')
 def worker_stop():
     """Stop all active workers gracefully"""
+    import worker
     worker.stop_workers()
 
 
 @cli.command()
 def status():
     """Show queue status"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-    
+    import job_manager
+    import worker
     counts = job_manager.get_job_counts()
+    # Only workers started by this process; see get_active_worker_count
     active_workers = worker.get_active_worker_count()
     
     click.echo("\n[QUEUE STATUS]")
@@ -113,13 +164,15 @@ def status():
 @cli.command()
 @click.option('--state', help='Filter by state (pending/processing/completed/failed/dead)')
 @click.option('--limit', default=50, help='Maximum number of jobs to display')
-def list(state, limit):
+@click.option('--due', is_flag=True, help='Only pending jobs that are due to run now')
+def list(state, limit, due):
     """List jobs"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
+    import job_manager
+    if due and state not in (None, 'pending'):
+        click.echo("Error: --due only applies to pending jobs", err=True)
         sys.exit(1)
     
-    jobs = job_manager.list_jobs(state=state, limit=limit)
+    jobs = job_manager.list_jobs(state=state, limit=limit, due_only=due)
     
     if not jobs:
         click.echo("No jobs found.")
@@ -153,10 +206,7 @@ def dlq():
 @click.option('--limit', default=50, help='Maximum number of jobs to display')
 def dlq_list(limit):
     """List jobs in Dead Letter Queue"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-
+    import job_manager
     jobs = job_manager.list_dlq_jobs(limit=limit)
 
     if not jobs:
@@ -183,10 +233,7 @@ def dlq_list(limit):
 @click.argument('job_id')
 def dlq_retry(job_id):
     """Retry a job from Dead Letter Queue"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-
+    import job_manager
     success, message = job_manager.retry_dlq_job(job_id)
 
     if success:
@@ -206,10 +253,6 @@ def config():
 @click.argument('key', required=False)
 def config_get(key):
     """Get configuration value(s)"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-
     if key:
         # Get specific config
         normalized_key = config_manager.normalize_config_key(key)
@@ -240,10 +283,6 @@ def config_get(key):
 @click.argument('value')
 def config_set(key, value):
     """Set configuration value"""
-    if not db.db_exists():
-        click.echo("Error: Database not initialized. Run 'queuectl init-db' first.", err=True)
-        sys.exit(1)
-
     normalized_key = config_manager.normalize_config_key(key)
     config_manager.set_config(normalized_key, value)
 
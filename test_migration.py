@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that databases from older versions are upgraded.
+Older versions stored timestamps as ISO strings in TEXT columns; commands
+must refuse to run on such a database until init-db converts it.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUEUECTL = os.path.join(HERE, 'queuectl.py')
+
+# The jobs table as created by the first release
+LEGACY_JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  id TEXT PRIMARY KEY,
+  command TEXT NOT NULL,
+  state TEXT NOT NULL,
+  attempts INTEGER DEFAULT 0,
+  max_retries INTEGER DEFAULT 3,
+  created_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  next_run_at TEXT NOT NULL,
+  priority INTEGER DEFAULT 0,
+  locked_by TEXT,
+  locked_at TEXT,
+  processing_started_at TEXT,
+  processing_finished_at TEXT,
+  exit_code INTEGER,
+  last_error TEXT,
+  stdout_path TEXT,
+  stderr_path TEXT,
+  timeout_seconds INTEGER DEFAULT 30
+);
+"""
+
+LEGACY_CONFIG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS config (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+"""
+
+# (id, state, created_at, next_run_at, processing_finished_at)
+LEGACY_JOBS = [
+    ('old-pending', 'pending', '2025-11-06T12:00:00.123456Z', '2025-11-06T12:00:00.123456Z', None),
+    ('old-done', 'completed', '2025-11-06T12:00:00Z', '2025-11-06T12:00:00Z', '2025-11-06T12:00:05Z'),
+    # Epoch seconds written into the TEXT columns by a newer version
+    ('epoch-pending', 'pending', '1762430400', '1762430400', None),
+]
+
+EXPECTED_EPOCHS = {
+    'old-pending': 1762430400,
+    'old-done': 1762430400,
+    'epoch-pending': 1762430400,
+}
+
+
+def create_legacy_db(path):
+    """Build a database the way the first release's init-db and enqueue did"""
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_JOBS_SCHEMA)
+    conn.execute(LEGACY_CONFIG_SCHEMA)
+    conn.executemany(
+        "INSERT INTO config (key, value) VALUES (?, ?)",
+        [('max_retries', '3'), ('backoff_base', '2'), ('poll_interval', '1')]
+    )
+    conn.executemany(
+        "INSERT INTO jobs (id, command, state, created_at, updated_at, next_run_at, "
+        "processing_finished_at) VALUES (?, 'echo migrated', ?, ?, ?, ?, ?)",
+        [(job_id, state, created, created, next_run, finished)
+         for job_id, state, created, next_run, finished in LEGACY_JOBS]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_cmd(args, workdir, description="", input=None):
+    """Run a queuectl command in workdir and return (returncode, output)"""
+    if description:
+        print(f"\n{'='*70}")
+        print(f"  {description}")
+        print('='*70)
+
+    print(f"$ queuectl {' '.join(args)}\n")
+    result = subprocess.run(
+        [sys.executable, QUEUECTL] + args, cwd=workdir,
+        capture_output=True, text=True, input=input
+    )
+    output = result.stdout + result.stderr
+    if output:
+        print(output)
+    return result.returncode, output
+
+
+def main():
+    print("""
+================================================================================
+                    Schema Migration Test
+================================================================================
+This test verifies that a database from an older version is upgraded.
+
+Test Steps:
+1. Create a database with the old ISO timestamp schema
+2. Verify commands refuse to run on it and ask for init-db
+3. Run init-db
+4. Verify timestamps are now integer epoch seconds
+5. Verify jobs can be listed and processed
+
+================================================================================
+""")
+
+    workdir = tempfile.mkdtemp(prefix='queuectl-migration-')
+    db_path = os.path.join(workdir, 'queuectl.db')
+
+    # Step 1: Legacy database
+    create_legacy_db(db_path)
+    print(f"[SETUP] Created old-format database at {db_path}")
+
+    # Step 2: Commands must stop cleanly until the upgrade
+    for args in (['list'],
+                 ['enqueue', '{"id":"new1","command":"echo new"}'],
+                 ['worker', 'start', '--count', '1', '--stop-when-empty']):
+        code, output = run_cmd(args, workdir, f"Step 2: {args[0]} before upgrade")
+        if code == 0 or "queuectl init-db" not in output or "Traceback" in output:
+            print(f"❌ FAILED: {args[0]} ran against the old schema")
+            return False
+
+    print("✅ Commands ask for init-db on the old schema")
+
+    # Step 3: Upgrade
+    code, output = run_cmd(['init-db'], workdir, "Step 3: Upgrade with init-db", input="y\n")
+    if code != 0:
+        print("❌ FAILED: init-db could not migrate the database")
+        return False
+
+    # Step 4: Check the converted values
+    print("\n" + "="*70)
+    print("  Step 4: Verify timestamps are epoch seconds")
+    print("="*70)
+    conn = sqlite3.connect(db_path)
+    types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(jobs)")}
+    rows = conn.execute(
+        "SELECT id, created_at, next_run_at, typeof(next_run_at), processing_finished_at FROM jobs"
+    ).fetchall()
+    conn.close()
+
+    if types['next_run_at'].upper() != 'INTEGER':
+        print(f"❌ FAILED: next_run_at is still {types['next_run_at']}")
+        return False
+    if len(rows) != len(LEGACY_JOBS):
+        print(f"❌ FAILED: expected {len(LEGACY_JOBS)} jobs, found {len(rows)}")
+        return False
+    for job_id, created_at, next_run_at, value_type, finished_at in rows:
+        if value_type != 'integer' or (created_at, next_run_at) != (EXPECTED_EPOCHS[job_id],) * 2:
+            print(f"❌ FAILED: job {job_id} converted to {created_at!r}, {next_run_at!r}")
+            return False
+        if job_id == 'old-done' and finished_at != EXPECTED_EPOCHS[job_id] + 5:
+            print(f"❌ FAILED: job {job_id} finished_at converted to {finished_at!r}")
+            return False
+
+    print("✅ All timestamps converted")
+
+    # Step 5: The upgraded database works
+    code, output = run_cmd(
+        ['worker', 'start', '--count', '1', '--stop-when-empty'], workdir,
+        "Step 5: Process migrated jobs"
+    )
+    if code != 0:
+        print("❌ FAILED: Worker could not run on the migrated database")
+        return False
+
+    code, output = run_cmd(['list', '--state', 'completed'], workdir)
+    for job_id, _, _, _, _ in LEGACY_JOBS:
+        if job_id not in output:
+            print(f"❌ FAILED: Job {job_id} not completed after the upgrade")
+            return False
+
+    print("✅ Migrated jobs processed")
+
+    print("\n" + "="*70)
+    print("           ✅ MIGRATION TEST PASSED")
+    print("="*70)
+
+    return True
+
+if __name__ == '__main__':
+    try:
+        success = main()
+        sys.exit(0 if success else 1)
+    except KeyboardInterrupt:
+        print("\n\nTest interrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Test failed with exception: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -9,8 +9,12 @@ import time
 import sys
 import os
 
-def run_cmd(args, description=""):
-    """Run a command and return output"""
+def run_cmd(args, description="", stream=False):
+    """
+    Run a command and return output.
+    With stream=True the child writes straight to our stdout/stderr and
+    no output is captured (use for long-running commands).
+    """
     if description:
         print(f"\n{'='*70}")
         print(f"  {description}")
@@ -19,6 +23,11 @@ def run_cmd(args, description=""):
     cmd_str = ' '.join(args)
     print(f"$ {cmd_str}\n")
     
+    if stream:
+        # Flush our own buffered output so it stays ahead of the child's
+        sys.stdout.flush()
+        return subprocess.run(args).returncode == 0, ""
+    
     result = subprocess.run(args, capture_output=True, text=True)
     if result.stdout:
         print(result.stdout)
@@ -122,7 +131,8 @@ Test Steps:
     # Step 6: Process jobs
     success, _ = run_cmd(
         ['python', 'queuectl.py', 'worker', 'start', '--count', '1', '--stop-when-empty'],
-        "Step 6: Process jobs with worker"
+        "Step 6: Process jobs with worker",
+        stream=True
     )
     if not success:
         print("❌ FAILED: Worker execution failed")
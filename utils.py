@@ -1,34 +1,87 @@
 """
 Utility functions for QueueCTL
 """
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from typing import Optional
+import calendar
+import functools
+import math
 import os
-import uuid
+import time
+
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") for the last second formatted, so
+# now_iso only formats the date/time part once per second
+_ISO_SECOND_CACHE = (None, "")
+
+LOGS_DIR = "logs"
+# Directory prefix for log paths, with the platform's separator
+_LOG_PREFIX = os.path.join(LOGS_DIR, "")
+# Set once the logs directory has been created by this process; created on
+# first use rather than at import so commands that never run jobs don't
+# leave an empty logs/ behind
+_LOGS_DIR_READY = False
 
 
 def now_iso() -> str:
     """Return current UTC time in ISO format"""
-    return datetime.utcnow().isoformat() + 'Z'
+    global _ISO_SECOND_CACHE
+    t = time.time()
+    second = int(t)
+    cached_second, prefix = _ISO_SECOND_CACHE
+    if second != cached_second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _ISO_SECOND_CACHE = (second, prefix)
+    return "%s.%06dZ" % (prefix, (t - second) * 1_000_000)
 
 
-def parse_iso(iso_string: str) -> datetime:
-    """Parse ISO format string to datetime"""
-    # Remove 'Z' suffix if present
-    if iso_string.endswith('Z'):
-        iso_string = iso_string[:-1]
-    return datetime.fromisoformat(iso_string)
+def now_epoch() -> int:
+    """Return current UTC time as epoch seconds (the stored timestamp format)"""
+    return int(time.time())
+
 
+def epoch_after(seconds: int) -> int:
+    """
+    Return the first epoch second at least `seconds` from now. Rounds up
+    where now_epoch rounds down, so a job scheduled this way is never
+    claimed early.
+    """
+    return math.ceil(time.time() + seconds)
 
-def is_past(iso_string: str) -> bool:
-    """Check if given ISO timestamp is in the past"""
-    return parse_iso(iso_string) <= datetime.utcnow()
 
+def to_epoch(iso_string: str) -> int:
+    """Convert an ISO timestamp to epoch seconds (naive values are UTC)"""
+    return calendar.timegm(parse_iso(iso_string).utctimetuple())
 
-def add_seconds(iso_string: str, seconds: int) -> str:
-    """Add seconds to an ISO timestamp"""
-    dt = parse_iso(iso_string)
-    new_dt = dt + timedelta(seconds=seconds)
-    return new_dt.isoformat() + 'Z'
+
+def format_epoch(epoch: int) -> str:
+    """Format epoch seconds as an ISO UTC timestamp"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_iso(iso_string: str) -> datetime:
+    """
+    Parse ISO format string to a naive UTC datetime.
+    Cached: enqueue parses each run_at twice (validate_job_data, then
+    to_epoch) and batches often repeat the same schedule. datetimes are
+    immutable, so sharing the cached instance is safe.
+    """
+    # Stripping 'Z' and parsing naive is the fast path: letting
+    # fromisoformat (3.11+) build an aware datetime costs several times more
+    if iso_string.endswith('Z'):
+        dt = datetime.fromisoformat(iso_string[:-1])
+        if dt.tzinfo is None:
+            return dt
+        # An offset followed by 'Z' ('+05:00Z') is not valid ISO 8601, and
+        # fromisoformat rejects it when given the whole string
+        raise ValueError(f"Invalid isoformat string: {iso_string!r}")
+    
+    dt = datetime.fromisoformat(iso_string)
+    if dt.tzinfo is not None:
+        # Explicit offsets ('+05:30') are converted so callers always get UTC
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
 
 
 def calculate_backoff_delay(attempts: int, backoff_base: int) -> int:
@@ -37,69 +90,78 @@ def calculate_backoff_delay(attempts: int, backoff_base: int) -> int:
 
 
 def generate_job_id() -> str:
-    """Generate a unique job ID"""
-    return str(uuid.uuid4())
+    """
+    Generate a unique job ID: a random (version 4) UUID in canonical form,
+    built from os.urandom without going through uuid.UUID
+    """
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
 
 
 def generate_worker_id() -> str:
     """Generate a unique worker ID"""
-    return f"worker-{uuid.uuid4().hex[:8]}"
+    return "worker-" + os.urandom(4).hex()
 
 
-def get_log_paths(job_id: str) -> tuple:
-    """Get stdout and stderr log file paths for a job"""
-    logs_dir = "logs"
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    stdout_path = os.path.join(logs_dir, f"{job_id}_out.txt")
-    stderr_path = os.path.join(logs_dir, f"{job_id}_err.txt")
+def get_worker_log_paths(worker_id: str) -> tuple:
+    """Get the (stdout_path, stderr_path) log files a worker writes its jobs' output to"""
+    global _LOGS_DIR_READY
+    if not _LOGS_DIR_READY:
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        _LOGS_DIR_READY = True
     
-    return stdout_path, stderr_path
+    return f"{_LOG_PREFIX}{worker_id}.out.log", f"{_LOG_PREFIX}{worker_id}.err.log"
 
 
-def format_timestamp(iso_string: str) -> str:
-    """Format ISO timestamp for display"""
-    if not iso_string:
+def format_timestamp(epoch: Optional[int]) -> str:
+    """Format a stored epoch timestamp for display"""
+    if epoch is None:
         return "N/A"
-    return iso_string
+    return format_epoch(epoch)
+
+
+# (field, smallest allowed value, error when below it) for the optional
+# integer fields checked by validate_job_data
+_INT_FIELD_RULES = (
+    ('priority', 0, "must be non-negative"),
+    ('max_retries', 0, "must be non-negative"),
+    ('timeout_seconds', 1, "must be positive"),
+)
+
+_MISSING = object()
 
 
 def validate_job_data(job_data: dict) -> tuple:
     """
     Validate job data and return (is_valid, error_message)
     """
+    if not isinstance(job_data, dict):
+        return False, "Job must be a JSON object"
+    
     if not job_data.get('id'):
         return False, "Job 'id' is required"
     
+    if not isinstance(job_data['id'], (str, int)):
+        return False, "Job 'id' must be a string"
+    
     if not job_data.get('command'):
         return False, "Job 'command' is required"
     
-    # Validate priority if present
-    if 'priority' in job_data:
-        try:
-            priority = int(job_data['priority'])
-            if priority < 0:
-                return False, "Job 'priority' must be non-negative"
-        except (ValueError, TypeError):
-            return False, "Job 'priority' must be an integer"
-    
-    # Validate max_retries if present
-    if 'max_retries' in job_data:
-        try:
-            max_retries = int(job_data['max_retries'])
-            if max_retries < 0:
-                return False, "Job 'max_retries' must be non-negative"
-        except (ValueError, TypeError):
-            return False, "Job 'max_retries' must be an integer"
-    
-    # Validate timeout_seconds if present
-    if 'timeout_seconds' in job_data:
-        try:
-            timeout = int(job_data['timeout_seconds'])
-            if timeout <= 0:
-                return False, "Job 'timeout_seconds' must be positive"
-        except (ValueError, TypeError):
-            return False, "Job 'timeout_seconds' must be an integer"
+    # Validate the optional integer fields that are present
+    for field, minimum, range_error in _INT_FIELD_RULES:
+        value = job_data.get(field, _MISSING)
+        if value is _MISSING:
+            continue
+        if type(value) is not int:
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                return False, f"Job '{field}' must be an integer"
+        if value < minimum:
+            return False, f"Job '{field}' {range_error}"
     
     # Validate run_at if present
     if 'run_at' in job_data:
@@ -111,17 +173,13 @@ def validate_job_data(job_data: dict) -> tuple:
     return True, None
 
 
-def format_duration(start_iso: str, end_iso: str) -> str:
-    """Calculate and format duration between two timestamps"""
-    if not start_iso or not end_iso:
+def format_duration(start_epoch: Optional[int], end_epoch: Optional[int]) -> str:
+    """Calculate and format duration between two stored epoch timestamps"""
+    if start_epoch is None or end_epoch is None:
         return "N/A"
     
     try:
-        start = parse_iso(start_iso)
-        end = parse_iso(end_iso)
-        duration = end - start
-        
-        total_seconds = int(duration.total_seconds())
+        total_seconds = int(end_epoch - start_epoch)
         if total_seconds < 60:
             return f"{total_seconds}s"
         elif total_seconds < 3600:
@@ -1,22 +1,70 @@
 """
 Worker process for QueueCTL - executes jobs with retry logic
+
+All workers in a process run as coroutines on a single asyncio event loop.
+Job commands run as asyncio subprocesses, and the blocking sqlite3 calls
+are handed to the loop's default thread pool with asyncio.to_thread.
 """
-import subprocess
-import threading
-import time
+import asyncio
+import contextlib
+import logging
+import os
+import queue
+import re
+import shlex
 import signal
+import sqlite3
 import sys
-from typing import Optional, Dict
+import time
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, List
 import db
 import utils
 import config_manager
 import job_manager
 
 
-# Global flag for graceful shutdown
-shutdown_flag = threading.Event()
+# Worker messages go to stdout as plain lines. While workers run they are
+# handed to a background thread through a queue (see _queued_logging), so
+# job handling never blocks on terminal or pipe writes.
+log = logging.getLogger("queuectl.worker")
+log.setLevel(logging.INFO)
+log.propagate = False
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_console_handler)
+
+# Event loop state, set up by _run_workers for the duration of start_workers
+_loop: Optional[asyncio.AbstractEventLoop] = None
+shutdown_flag: Optional[asyncio.Event] = None
+_job_event: Optional[asyncio.Event] = None
 active_workers = []
 
+# Commands containing none of these characters mean the same with or
+# without a shell, so they are exec'd directly and skip starting /bin/sh
+_SHELL_META = re.compile(r'[|&;<>()$`\\"\'*?\[\]{}#~=%!\n]')
+
+# Finished-job updates are buffered and written in batches, so N workers
+# finishing jobs cost one transaction per flush instead of one each. If the
+# process dies before a flush, those jobs stay 'processing' and are picked
+# up again by recover_stale_locks.
+RESULT_FLUSH_INTERVAL = 0.01  # seconds
+RESULT_BATCH_SIZE = 100
+
+# Seconds a running job gets to exit after SIGTERM at shutdown, before SIGKILL
+SHUTDOWN_GRACE_PERIOD = 5
+
+# After a failed write, retries back off up to this delay (seconds); the
+# final flush at shutdown gives up after FINAL_FLUSH_ATTEMPTS tries
+RESULT_RETRY_MAX_DELAY = 5.0
+FINAL_FLUSH_ATTEMPTS = 5
+
+_completed_results: List[tuple] = []
+_dead_results: List[tuple] = []
+_retried_results: List[tuple] = []
+_results_ready: Optional[asyncio.Event] = None
+
 
 class Worker:
     """Worker that processes jobs from the queue"""
@@ -25,293 +73,523 @@ class Worker:
         self.worker_id = worker_id
         self.running = False
         self.current_job_id = None
-        self.thread = None
         self.stop_when_empty = stop_when_empty
-        self.idle_checks = 0
-    
-    def start(self):
-        """Start the worker in a separate thread"""
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=False)
-        self.thread.start()
+        self.idle_since = None  # time.monotonic() when the queue was first seen empty
+        self.stdout_path = None
+        self.stderr_path = None
+        self.stdout_fd = asyncio.subprocess.DEVNULL
+        self.stderr_fd = asyncio.subprocess.DEVNULL
+        self.current_proc = None
+        self.interrupted = False  # current job was signalled by stop()
     
     def stop(self):
-        """Stop the worker gracefully"""
+        """Stop the worker gracefully, interrupting the job it is running"""
         self.running = False
+        self._interrupt_job()
     
-    def join(self):
-        """Wait for worker thread to finish"""
-        if self.thread:
-            self.thread.join()
+    def _interrupt_job(self):
+        """
+        Send SIGTERM to the running job's process group, and SIGKILL if it
+        is still running SHUTDOWN_GRACE_PERIOD seconds later. Job processes
+        run in their own session, so Ctrl+C on the terminal doesn't reach
+        them; without this, shutdown would wait for every job to finish.
+        """
+        proc = self.current_proc
+        if proc is None or proc.returncode is not None or self.interrupted:
+            return
+        self.interrupted = True
+        _terminate_job_process(proc)
+        _loop.call_later(SHUTDOWN_GRACE_PERIOD, _kill_job_process_if_running, proc)
     
-    def _run(self):
+    async def run(self):
         """Main worker loop"""
-        poll_interval = config_manager.get_poll_interval()
-        
+        self.running = True
+        poll_interval = await asyncio.to_thread(config_manager.get_poll_interval)
+        self._open_logs()
+        try:
+            await self._run(poll_interval)
+        finally:
+            for fd in (self.stdout_fd, self.stderr_fd):
+                if fd >= 0:
+                    os.close(fd)
+            self.running = False
+    
+    def _open_logs(self):
+        """
+        Open this worker's stdout and stderr logs, which every job it runs
+        appends to. Two files per worker instead of two per job keeps the
+        logs directory from filling with small files.
+        """
+        self.stdout_path, self.stderr_path = utils.get_worker_log_paths(self.worker_id)
+        self.stdout_fd = self._open_log(self.stdout_path, "stdout")
+        self.stderr_fd = self._open_log(self.stderr_path, "stderr")
+        if self.stdout_fd < 0:
+            self.stdout_path = None
+        if self.stderr_fd < 0:
+            self.stderr_path = None
+    
+    def _open_log(self, path: str, stream: str) -> int:
+        """Open one log file for appending; DEVNULL if it can't be opened"""
+        try:
+            return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except OSError as e:
+            log.warning("[%s] Failed to open log %s, job %s will be discarded: %s",
+                        self.worker_id, path, stream, e)
+            return asyncio.subprocess.DEVNULL
+    
+    async def _run(self, poll_interval: float):
+        """Claim and run jobs until stopped"""
         while self.running and not shutdown_flag.is_set():
             try:
                 # Try to fetch and lock a job
-                job = self._fetch_and_lock_job()
+                job = await self._fetch_and_lock_job()
                 
                 if job:
                     self.current_job_id = job['id']
-                    self._process_job(job)
+                    await self._process_job(job)
                     self.current_job_id = None
-                    self.idle_checks = 0  # Reset idle counter
+                    self.idle_since = None  # Reset idle timer
                 else:
                     # No job available
                     if self.stop_when_empty:
-                        self.idle_checks += 1
-                        # Stop if queue is empty for 3 consecutive checks
-                        if self.idle_checks >= 3:
-                            print(f"[{self.worker_id}] Queue empty, stopping...")
+                        # Stop once the queue has stayed empty for 3 poll
+                        # intervals; timed rather than counted, since
+                        # wake-ups can make checks arbitrarily frequent
+                        now = time.monotonic()
+                        if self.idle_since is None:
+                            self.idle_since = now
+                        elif now - self.idle_since >= 3 * poll_interval:
+                            log.info("[%s] Queue empty, stopping...", self.worker_id)
                             self.running = False
                             break
-                    time.sleep(poll_interval)
+                    await self._wait_for_work(poll_interval)
             
             except Exception as e:
-                print(f"[{self.worker_id}] Error in worker loop: {e}")
-                time.sleep(poll_interval)
+                log.error("[%s] Error in worker loop: %s", self.worker_id, e)
+                # Plain back-off: _wait_for_work queries the database, which
+                # may be what just failed
+                try:
+                    await asyncio.wait_for(shutdown_flag.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def _wait_for_work(self, poll_interval: float):
+        """
+        Sleep until a job may be claimable: woken early by an enqueue in
+        this process, or when the earliest scheduled job falls due.
+        Called after a claim found nothing, so a job that is already due
+        couldn't be claimed (the write lock was busy, or the claim lost a
+        race); that case waits the full poll_interval instead of retrying
+        at once in a tight loop.
+        """
+        if shutdown_flag.is_set():
+            return
+        
+        timeout = poll_interval
+        next_run_at = await asyncio.to_thread(job_manager.get_next_run_at)
+        if next_run_at is not None:
+            until_due = next_run_at - time.time()
+            if until_due > 0:
+                timeout = min(timeout, until_due)
+        
+        try:
+            await asyncio.wait_for(_job_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        _job_event.clear()
     
-    def _fetch_and_lock_job(self) -> Optional[Dict]:
+    async def _fetch_and_lock_job(self) -> Optional[sqlite3.Row]:
         """
         Atomically fetch and lock an eligible job
         """
-        now = utils.now_iso()
+        now = utils.now_epoch()
         
-        # Use a transaction to atomically select and lock a job
         try:
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Find an eligible job
-                cursor.execute(
-                    """
-                    SELECT id FROM jobs
-                    WHERE state = 'pending' AND next_run_at <= ?
-                    ORDER BY priority ASC, next_run_at ASC
-                    LIMIT 1
-                    """,
-                    (now,)
-                )
-                
-                result = cursor.fetchone()
-                if not result:
-                    return None
-                
-                job_id = result['id']
-                
-                # Lock the job
-                cursor.execute(
-                    """
-                    UPDATE jobs
-                    SET state = 'processing',
-                        locked_by = ?,
-                        locked_at = ?,
-                        processing_started_at = ?,
-                        updated_at = ?
-                    WHERE id = ? AND state = 'pending'
-                    """,
-                    (self.worker_id, now, now, now, job_id)
-                )
-                
-                if cursor.rowcount == 0:
-                    # Job was taken by another worker
-                    return None
-                
-                # Fetch the full job details
-                cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-                job_row = cursor.fetchone()
-                
-                conn.commit()
-                
-                if job_row:
-                    return dict(job_row)
-                
-                return None
+            return await asyncio.to_thread(
+                job_manager.claim_next_job, self.worker_id, now,
+                self.stdout_path, self.stderr_path
+            )
         
         except Exception as e:
-            print(f"[{self.worker_id}] Error fetching job: {e}")
+            log.error("[%s] Error fetching job: %s", self.worker_id, e)
             return None
     
-    def _process_job(self, job: Dict):
+    async def _process_job(self, job: sqlite3.Row):
         """Execute a job and handle the result"""
         job_id = job['id']
         command = job['command']
         timeout = job['timeout_seconds']
         
-        print(f"[{self.worker_id}] Processing job {job_id}: {command}")
+        log.info("[%s] Processing job %s: %s", self.worker_id, job_id, command)
         
         try:
-            # Execute the command
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout
+            # Execute the command, its output going straight to the worker log
+            self._write_log_header(job)
+            proc = self.current_proc = await _start_job_process(
+                command, self.stdout_fd, self.stderr_fd
             )
+            if shutdown_flag.is_set():
+                # Shutdown began while the process was starting
+                self._interrupt_job()
             
-            # Save output to log files
-            self._save_output(job, result.stdout, result.stderr)
+            try:
+                await asyncio.wait_for(proc.wait(), timeout)
+            except asyncio.TimeoutError:
+                _kill_job_process(proc)
+                await proc.wait()
+                raise
             
             # Handle result
-            if result.returncode == 0:
-                self._handle_success(job, result.returncode)
+            exit_code = proc.returncode
+            if exit_code < 0:
+                # Killed by signal n: exec reports -n, report 128+n as
+                # /bin/sh does, so the code doesn't depend on which path ran it
+                exit_code = 128 - exit_code
+            if self.interrupted:
+                self._handle_interrupted(job)
+            elif exit_code == 0:
+                self._handle_success(job, exit_code)
             else:
-                self._handle_failure(job, result.returncode, f"Command exited with code {result.returncode}")
+                await self._handle_failure(job, exit_code, f"Command exited with code {exit_code}")
         
-        except subprocess.TimeoutExpired:
-            print(f"[{self.worker_id}] Job {job_id} timed out after {timeout}s")
-            self._handle_failure(job, -1, f"Job timed out after {timeout} seconds")
+        except asyncio.TimeoutError:
+            log.warning("[%s] Job %s timed out after %ss", self.worker_id, job_id, timeout)
+            await self._handle_failure(job, -1, f"Job timed out after {timeout} seconds")
         
         except Exception as e:
-            print(f"[{self.worker_id}] Job {job_id} failed with error: {e}")
-            self._handle_failure(job, -1, str(e))
+            log.warning("[%s] Job %s failed with error: %s", self.worker_id, job_id, e)
+            await self._handle_failure(job, -1, str(e))
+        
+        finally:
+            if self.interrupted:
+                # The job's main process is gone; don't leave its children running
+                _kill_job_process(proc)
+            self.current_proc = None
+            self.interrupted = False
+
+    def _write_log_header(self, job: sqlite3.Row):
+        """Mark the start of a job attempt in both worker logs"""
+        header = f"\n=== Job {job['id']} attempt {job['attempts'] + 1} at {utils.now_iso()} ===\n"
+        for fd in (self.stdout_fd, self.stderr_fd):
+            if fd < 0:
+                continue
+            try:
+                os.write(fd, header.encode())
+            except OSError as e:
+                log.warning("[%s] Failed to write log header: %s", self.worker_id, e)
 
-    def _save_output(self, job: Dict, stdout: str, stderr: str):
-        """Save job output to log files"""
-        try:
-            if job['stdout_path']:
-                with open(job['stdout_path'], 'a') as f:
-                    f.write(f"\n=== Attempt {job['attempts'] + 1} at {utils.now_iso()} ===\n")
-                    f.write(stdout)
-
-            if job['stderr_path']:
-                with open(job['stderr_path'], 'a') as f:
-                    f.write(f"\n=== Attempt {job['attempts'] + 1} at {utils.now_iso()} ===\n")
-                    f.write(stderr)
-        except Exception as e:
-            print(f"[{self.worker_id}] Failed to save output: {e}")
+    def _handle_interrupted(self, job: sqlite3.Row):
+        """
+        Put a job stopped by shutdown back to pending, due now. It wasn't
+        the job's fault, so the attempt is not counted.
+        """
+        job_id = job['id']
+        now = utils.now_epoch()
+
+        _queue_result(
+            _retried_results,
+            (job_id, job['attempts'], None, "Interrupted by worker shutdown", now, now)
+        )
+        log.info("[%s] Job %s interrupted by shutdown, returned to pending", self.worker_id, job_id)
 
-    def _handle_success(self, job: Dict, exit_code: int):
+    def _handle_success(self, job: sqlite3.Row, exit_code: int):
         """Handle successful job completion"""
         job_id = job['id']
 
-        db.execute_update(
-            """
-            UPDATE jobs
-            SET state = 'completed',
-                exit_code = ?,
-                processing_finished_at = ?,
-                updated_at = ?
-            WHERE id = ?
-            """,
-            (exit_code, utils.now_iso(), utils.now_iso(), job_id)
-        )
+        _queue_result(_completed_results, (job_id, exit_code, utils.now_epoch()))
 
-        print(f"[{self.worker_id}] Job {job_id} completed successfully")
+        log.info("[%s] Job %s completed successfully", self.worker_id, job_id)
 
-    def _handle_failure(self, job: Dict, exit_code: int, error_message: str):
+    async def _handle_failure(self, job: sqlite3.Row, exit_code: int, error_message: str):
         """Handle job failure with retry logic"""
         job_id = job['id']
         attempts = job['attempts'] + 1
         max_retries = job['max_retries']
 
-        print(f"[{self.worker_id}] Job {job_id} failed (attempt {attempts}/{max_retries}): {error_message}")
+        log.warning("[%s] Job %s failed (attempt %s/%s): %s",
+                    self.worker_id, job_id, attempts, max_retries, error_message)
 
         if attempts >= max_retries:
             # Move to DLQ
-            db.execute_update(
-                """
-                UPDATE jobs
-                SET state = 'dead',
-                    attempts = ?,
-                    exit_code = ?,
-                    last_error = ?,
-                    processing_finished_at = ?,
-                    updated_at = ?
-                WHERE id = ?
-                """,
-                (attempts, exit_code, error_message, utils.now_iso(), utils.now_iso(), job_id)
+            _queue_result(
+                _dead_results,
+                (job_id, attempts, exit_code, error_message, utils.now_epoch())
             )
-            print(f"[{self.worker_id}] Job {job_id} moved to DLQ after {attempts} attempts")
+            log.warning("[%s] Job %s moved to DLQ after %s attempts", self.worker_id, job_id, attempts)
         else:
             # Retry with exponential backoff
-            backoff_base = config_manager.get_backoff_base()
-            delay = utils.calculate_backoff_delay(attempts, backoff_base)
-            next_run_at = utils.add_seconds(utils.now_iso(), delay)
-
-            db.execute_update(
-                """
-                UPDATE jobs
-                SET state = 'pending',
-                    attempts = ?,
-                    exit_code = ?,
-                    last_error = ?,
-                    next_run_at = ?,
-                    locked_by = NULL,
-                    locked_at = NULL,
-                    updated_at = ?
-                WHERE id = ?
-                """,
-                (attempts, exit_code, error_message, next_run_at, utils.now_iso(), job_id)
+            # May read backoff_base from the database on first use
+            delay = await asyncio.to_thread(config_manager.get_backoff_delay, attempts)
+            now = utils.now_epoch()
+            next_run_at = utils.epoch_after(delay)
+
+            _queue_result(
+                _retried_results,
+                (job_id, attempts, exit_code, error_message, next_run_at, now)
             )
-            print(f"[{self.worker_id}] Job {job_id} will retry in {delay}s (attempt {attempts}/{max_retries})")
+            log.info("[%s] Job %s will retry in %ss (attempt %s/%s)",
+                     self.worker_id, job_id, delay, attempts, max_retries)
 
 
-def start_workers(count: int, stop_when_empty: bool = False):
-    """Start multiple worker processes"""
-    global active_workers
+@lru_cache(maxsize=1024)
+def _split_command(command: str) -> Optional[tuple]:
+    """
+    Return the argv for running command without a shell, or None if it
+    needs one. Cached, so retries of the same command skip the parse.
+    """
+    if os.name != 'posix' or _SHELL_META.search(command):
+        return None
+    return tuple(shlex.split(command)) or None
+
+
+async def _start_job_process(command: str, stdout_fd: int,
+                             stderr_fd: int) -> asyncio.subprocess.Process:
+    """Start a job command writing its stdout to stdout_fd and stderr to stderr_fd"""
+    options = dict(stdout=stdout_fd, stderr=stderr_fd, start_new_session=True)
+    argv = _split_command(command)
+    if argv:
+        try:
+            return await asyncio.create_subprocess_exec(*argv, **options)
+        except OSError:
+            # Not something exec can run (a shell builtin such as `exit 3`,
+            # a script without a #! line, ...); let the shell run it and
+            # report errors as usual
+            pass
+    return await asyncio.create_subprocess_shell(command, **options)
 
-    print(f"Starting {count} workers...")
+
+def _terminate_job_process(proc: asyncio.subprocess.Process):
+    """Ask a job's process and everything it started to exit"""
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except ProcessLookupError:
+        pass
+
+
+def _kill_job_process_if_running(proc: asyncio.subprocess.Process):
+    """SIGKILL a job that outlived its shutdown grace period"""
+    if proc.returncode is None:
+        _kill_job_process(proc)
+
+
+def _kill_job_process(proc: asyncio.subprocess.Process):
+    """Kill a job's process and everything it started"""
+    try:
+        if hasattr(os, 'killpg'):
+            # start_new_session made the shell a process group leader
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _queue_result(results: List[tuple], args: tuple):
+    """Buffer a finished-job update for the flusher"""
+    results.append(args)
+    _results_ready.set()
+
+
+def _pending_result_count() -> int:
+    """Number of buffered job results not yet written"""
+    return len(_completed_results) + len(_dead_results) + len(_retried_results)
+
+
+async def flush_results() -> bool:
+    """
+    Write all buffered job results in a single transaction. On failure the
+    results are put back in the buffer; returns whether the write succeeded.
+    """
+    completed = _completed_results[:]
+    dead = _dead_results[:]
+    retried = _retried_results[:]
+    del _completed_results[:], _dead_results[:], _retried_results[:]
+    _results_ready.clear()
+
+    if not (completed or dead or retried):
+        return True
+
+    try:
+        await asyncio.to_thread(job_manager.apply_job_results, completed, dead, retried)
+    except Exception as e:
+        log.error("Error saving %s job results: %s",
+                  len(completed) + len(dead) + len(retried), e)
+        _completed_results[:0] = completed
+        _dead_results[:0] = dead
+        _retried_results[:0] = retried
+        _results_ready.set()
+        return False
+    return True
+
+
+async def _flush_loop(workers_done: asyncio.Event):
+    """Write buffered results shortly after they arrive, until workers finish"""
+    retry_delay = RESULT_FLUSH_INTERVAL
+    while not workers_done.is_set():
+        await _results_ready.wait()
+        # Let results from other workers gather, unless the batch is full
+        if _pending_result_count() < RESULT_BATCH_SIZE and not workers_done.is_set():
+            await asyncio.sleep(RESULT_FLUSH_INTERVAL)
+
+        if await flush_results():
+            retry_delay = RESULT_FLUSH_INTERVAL
+            continue
+
+        # Back off while the database keeps failing, but don't hold up shutdown
+        retry_delay = min(retry_delay * 2, RESULT_RETRY_MAX_DELAY)
+        log.warning("Retrying job results in %.2fs", retry_delay)
+        try:
+            await asyncio.wait_for(workers_done.wait(), retry_delay)
+        except asyncio.TimeoutError:
+            pass
+
+    await _final_flush()
+
+
+async def _final_flush():
+    """
+    Write the results still buffered at shutdown, retrying a few times.
+    Jobs whose results can't be saved stay 'processing' and will run again
+    once recover_stale_locks releases them, so they are reported by id.
+    """
+    retry_delay = RESULT_FLUSH_INTERVAL
+    for attempt in range(FINAL_FLUSH_ATTEMPTS):
+        if await flush_results():
+            return
+        if attempt + 1 < FINAL_FLUSH_ATTEMPTS:
+            retry_delay = min(retry_delay * 2, RESULT_RETRY_MAX_DELAY)
+            await asyncio.sleep(retry_delay)
+
+    lost = [
+        args[0]
+        for results in (_completed_results, _dead_results, _retried_results)
+        for args in results
+    ]
+    log.error("Could not save results for %s jobs after %s attempts; they remain "
+              "'processing' and will run again after stale lock recovery: %s",
+              len(lost), FINAL_FLUSH_ATTEMPTS, ", ".join(lost))
+
+
+def _wake_workers():
+    """Wake idle workers; safe to call from any thread"""
+    _loop.call_soon_threadsafe(_job_event.set)
+
+
+async def _run_workers(count: int, stop_when_empty: bool):
+    """Run count workers on the current event loop until they all stop"""
+    global _loop, shutdown_flag, _job_event, _results_ready
+
+    _loop = asyncio.get_running_loop()
+    shutdown_flag = asyncio.Event()
+    _job_event = asyncio.Event()
+    _results_ready = asyncio.Event()
+    workers_done = asyncio.Event()
+
+    job_manager.add_job_listener(_wake_workers)
+    flusher = asyncio.create_task(_flush_loop(workers_done))
 
     for i in range(count):
         worker_id = utils.generate_worker_id()
         worker = Worker(worker_id, stop_when_empty=stop_when_empty)
-        worker.start()
         active_workers.append(worker)
-        print(f"Started worker: {worker_id}")
+        log.info("Started worker: %s", worker_id)
 
     # Set up signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, _signal_handler)
-    signal.signal(signal.SIGTERM, _signal_handler)
+    previous_handlers = {
+        signum: signal.signal(signum, _signal_handler)
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
 
     if stop_when_empty:
-        print(f"{count} workers started. Will stop when queue is empty.")
+        log.info("%s workers started. Will stop when queue is empty.", count)
     else:
-        print(f"{count} workers started. Press Ctrl+C to stop.")
+        log.info("%s workers started. Press Ctrl+C to stop.", count)
 
     # Wait for all workers
     try:
-        for worker in active_workers:
-            worker.join()
-    except KeyboardInterrupt:
-        pass
+        await asyncio.gather(*(worker.run() for worker in active_workers))
+    finally:
+        workers_done.set()
+        _results_ready.set()
+        await flusher
+        job_manager.remove_job_listener(_wake_workers)
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        active_workers.clear()
+
+
+@contextlib.contextmanager
+def _queued_logging():
+    """Route worker log records through a queue to a listener thread"""
+    records = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    listener = QueueListener(records, _console_handler)
+
+    log.removeHandler(_console_handler)
+    log.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield
+    finally:
+        # stop() writes out everything still queued before returning
+        listener.stop()
+        log.removeHandler(queue_handler)
+        log.addHandler(_console_handler)
 
-    print("All workers stopped.")
 
+def start_workers(count: int, stop_when_empty: bool = False):
+    """Start multiple workers and block until they have all stopped"""
+    with _queued_logging():
+        log.info("Starting %s workers...", count)
 
-def stop_workers():
-    """Stop all active workers gracefully"""
-    global active_workers
+        try:
+            asyncio.run(_run_workers(count, stop_when_empty))
+        except KeyboardInterrupt:
+            pass
 
+        log.info("All workers stopped.")
+
+
+def stop_workers():
+    """
+    Stop all active workers gracefully. Must run on the workers' event
+    loop. Running jobs get SIGTERM, and SIGKILL after SHUTDOWN_GRACE_PERIOD
+    seconds; they go back to pending without using up an attempt. Results
+    are saved before start_workers returns.
+    """
     if not active_workers:
-        print("No active workers to stop.")
+        log.info("No active workers to stop.")
         return
 
-    print(f"Gracefully stopping {len(active_workers)} workers...")
+    log.info("Gracefully stopping %s workers...", len(active_workers))
     shutdown_flag.set()
 
     for worker in active_workers:
         worker.stop()
-
-    for worker in active_workers:
-        worker.join()
-
-    active_workers = []
-    print("All workers stopped.")
+    _job_event.set()
 
 
 def _signal_handler(signum, frame):
     """Handle shutdown signals"""
-    print("\nReceived shutdown signal. Stopping workers...")
+    # Signal handlers can interrupt the loop (or a logging call) midway, so
+    # schedule the shutdown as a loop callback instead of running it here
+    _loop.call_soon_threadsafe(_shutdown_on_signal)
+
+
+def _shutdown_on_signal():
+    """Stop the workers after SIGINT/SIGTERM; runs on the event loop"""
+    log.info("\nReceived shutdown signal. Stopping workers...")
     stop_workers()
-    sys.exit(0)
 
 
 def get_active_worker_count() -> int:
-    """Get count of active workers"""
+    """
+    Get count of active workers in this process. Workers are not recorded
+    in the database, so `queuectl status` run from another terminal sees 0.
+    """
     return len([w for w in active_workers if w.running])
 
 
@@ -319,7 +597,8 @@ def recover_stale_locks(timeout_minutes: int = 5):
     """
     Recover jobs that have been locked for too long (worker crashed)
     """
-    cutoff_time = utils.add_seconds(utils.now_iso(), -timeout_minutes * 60)
+    now = utils.now_epoch()
+    cutoff_time = now - timeout_minutes * 60
 
     rowcount = db.execute_update(
         """
@@ -330,11 +609,12 @@ def recover_stale_locks(timeout_minutes: int = 5):
             updated_at = ?
         WHERE state = 'processing' AND locked_at < ?
         """,
-        (utils.now_iso(), cutoff_time)
+        (now, cutoff_time)
     )
 
     if rowcount > 0:
-        print(f"Recovered {rowcount} stale jobs")
+        log.info("Recovered %s stale jobs", rowcount)
+        job_manager.notify_job_available()
 
     return rowcount
 